@@ -4,23 +4,44 @@
 # SPDX-License-Identifier: BSD 2-Clause License
 #
 
+import asyncio
+import fcntl
+import functools
+import gc
+import hashlib
 import os
+import shelve
+import tempfile
+import time
+from contextlib import contextmanager
+from importlib.resources import files
 
 import httpx
+import numpy as np
+import orjson
 from dotenv import load_dotenv
 from loguru import logger
 from pipecat.adapters.schemas.function_schema import FunctionSchema
 from pipecat.adapters.schemas.tools_schema import ToolsSchema
 from pipecat.audio.turn.smart_turn.local_smart_turn_v3 import LocalSmartTurnAnalyzerV3
-from pipecat.audio.vad.silero import SileroVADAnalyzer
-from pipecat.audio.vad.vad_analyzer import VADParams
-from pipecat.frames.frames import LLMRunFrame
+from pipecat.audio.vad.silero import SileroOnnxModel, SileroVADAnalyzer
+from pipecat.audio.vad.vad_analyzer import VADAnalyzer, VADParams
+from pipecat.frames.frames import (
+    Frame,
+    FunctionCallInProgressFrame,
+    LLMFullResponseEndFrame,
+    LLMFullResponseStartFrame,
+    LLMRunFrame,
+    LLMTextFrame,
+    StartInterruptionFrame,
+)
 from pipecat.pipeline.pipeline import Pipeline
 from pipecat.pipeline.runner import PipelineRunner
 from pipecat.pipeline.task import PipelineParams, PipelineTask
 from pipecat.processors.aggregators.llm_response import LLMUserAggregatorParams
 from pipecat.processors.aggregators.llm_context import LLMContext
 from pipecat.processors.aggregators.llm_response_universal import LLMContextAggregatorPair
+from pipecat.processors.frame_processor import FrameDirection, FrameProcessor
 from pipecat.processors.frameworks.rtvi import RTVIConfig, RTVIObserver, RTVIProcessor
 from pipecat.runner.types import RunnerArguments
 from pipecat.services.deepgram.stt import DeepgramSTTService
@@ -32,60 +53,312 @@ from pipecat.transports.daily.transport import DailyParams, DailyTransport
 
 load_dotenv(override=True)
 
+# LED faces for the 5x5 matrix, in the proxy's compact 25-digit format
+FACE_SMILE = "0009000009000090000900090"
+FACE_SAD = "0000900090000900009000009"
+FACE_HEART = "0990099990099999999009900"
+
+# Face and movements for each mood the LLM can pick in robot_action
+MOOD_TABLE = {
+    "happy": (FACE_SMILE, ("spin", "spin", "spin")),
+    "sad": (FACE_SAD, ("backwards",)),
+    "scared": (FACE_SAD, ("backwards", "backwards")),
+    "excited": (FACE_SMILE, ("forward", "backwards", "forward", "backwards")),
+    "shy": (FACE_HEART, ("backwards",)),
+    "curious": (FACE_SMILE, ("forward",)),
+    "tired": (FACE_SAD, ()),
+    "angry": (FACE_HEART, ()),
+}
+
+# Exact-match cache of the introduction turn, which is the same for every
+# session since it only depends on the model and the fixed messages
+INTRO_CACHE_PATH = os.getenv("INTRO_CACHE_PATH", "intro_cache")
+INTRO_CACHE_TTL_S = 24 * 60 * 60
+
+# Where the int8 copy of the Silero VAD model is written when the image is
+# built (see the Dockerfile); the FP32 model is used if it is missing
+SILERO_INT8_MODEL_PATH = os.getenv(
+    "SILERO_INT8_MODEL_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "silero_vad_int8.onnx"),
+)
+
+# Largest difference in speech probability from the FP32 model accepted for
+# the int8 model on the reference signal
+SILERO_INT8_MAX_DEVIATION = 0.05
+
+
+async def execute_robot_action(client: httpx.AsyncClient, pixels: str, moves: list) -> dict:
+    """Send LED matrix display and movements to the robot API.
 
-# Tool handler function
-async def handle_robot_action(params: FunctionCallParams):
-    """Handle robot actions including LED matrix display and movements."""
-    pixels = params.arguments.get("pixels", "")
-    moves = params.arguments.get("moves", [])
-
-    logger.info(f"Robot action - Pixels: {pixels}, Moves: {moves}")
+    Args:
+        client (httpx.AsyncClient): The session's robot API client.
+        pixels (str): LED matrix image or text.
+        moves (list): Movements to execute in sequence.
 
-    # Get base URL from environment variable
-    base_url = os.getenv("ROBOT_API_URL", "")
+    Returns:
+        dict: The tool call result reported back to the LLM.
+    """
+    logger.info("Robot action - Pixels: {}, Moves: {}", pixels, moves)
 
-    if not base_url:
+    if not str(client.base_url):
         logger.error("ROBOT_API_URL environment variable not set")
-        await params.result_callback({"status": "error", "message": "API URL not configured"})
-        return
+        return {"status": "error", "message": "API URL not configured"}
 
     try:
-        async with httpx.AsyncClient() as client:
-            # Make a single request to /actions with both pixels and movements
-            response = await client.post(
-                f"{base_url}/actions",
-                json={
-                    "pixels": pixels,
-                    "movements": moves
-                },
-                timeout=5.0
-            )
-            response.raise_for_status()
-            logger.info(f"Robot action executed successfully: {response.status_code}")
-
-            await params.result_callback({
-                "status": "success",
+        # Make a single request to /actions with both pixels and movements
+        response = await client.post(
+            "/actions",
+            content=orjson.dumps({
                 "pixels": pixels,
-                "movements": moves,
-                "response_code": response.status_code
-            })
+                "movements": moves
+            }),
+            headers={"Content-Type": "application/json"}
+        )
+        response.raise_for_status()
+        logger.info("Robot action executed successfully: {}", response.status_code)
+
+        return {
+            "status": "success",
+            "pixels": pixels,
+            "movements": moves,
+            "response_code": response.status_code
+        }
 
     except httpx.HTTPError as e:
-        logger.error(f"HTTP error executing robot action: {e}")
-        await params.result_callback({
+        logger.error("HTTP error executing robot action: {}", e)
+        return {
             "status": "error",
             "message": str(e),
             "pixels": pixels,
             "movements": moves
-        })
+        }
     except Exception as e:
-        logger.error(f"Error in robot action: {e}")
-        await params.result_callback({
+        logger.error("Error in robot action: {}", e)
+        return {
             "status": "error",
             "message": str(e),
             "pixels": pixels,
             "movements": moves
-        })
+        }
+
+
+def resolve_robot_action(arguments: dict) -> tuple[str, list]:
+    """Expand robot_action arguments into the (pixels, moves) to execute.
+
+    The mood selects an entry of MOOD_TABLE; explicit overrides win, even
+    when empty (e.g. moves_override=[] shows the mood's face without moving).
+    """
+    pixels, moves = MOOD_TABLE.get(arguments.get("mood"), ("", []))
+    if "pixels_override" in arguments:
+        pixels = arguments["pixels_override"]
+    if "moves_override" in arguments:
+        moves = arguments["moves_override"]
+    return pixels, list(moves)
+
+
+# Tool handler function
+async def handle_robot_action(client: httpx.AsyncClient, params: FunctionCallParams):
+    """Handle robot actions including LED matrix display and movements.
+
+    client is bound per session with functools.partial when registering.
+    """
+    pixels, moves = resolve_robot_action(params.arguments)
+
+    await params.result_callback(await execute_robot_action(client, pixels, moves))
+
+
+def intro_cache_key(model: str, system_msg: str, user_msg: str, tools: ToolsSchema) -> str:
+    """Exact-match cache key for the introduction turn.
+
+    Covers the tool schemas too, since the entry stores robot_action
+    arguments that must match the current schema.
+    """
+    tools_json = orjson.dumps(
+        [schema.to_default_dict() for schema in tools.standard_tools],
+        option=orjson.OPT_SORT_KEYS,
+    ).decode()
+    return hashlib.sha256(f"{model}\0{system_msg}\0{user_msg}\0{tools_json}".encode()).hexdigest()
+
+
+@contextmanager
+def open_intro_cache(exclusive: bool):
+    """Open the intro cache shelf under a file lock. Blocking.
+
+    dbm files are not safe for concurrent writers, and sessions may run in
+    parallel processes, so writers take an exclusive lock and readers a
+    shared one.
+    """
+    with open(f"{INTRO_CACHE_PATH}.lock", "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            with shelve.open(INTRO_CACHE_PATH, flag="c" if exclusive else "r") as cache:
+                yield cache
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def load_cached_intro(key: str) -> dict | None:
+    """Return the cached introduction response for key, if present and fresh."""
+    try:
+        with open_intro_cache(exclusive=False) as cache:
+            entry = cache.get(key)
+    except Exception as e:
+        logger.warning("Could not read intro cache: {}", e)
+        return None
+
+    if entry is None or time.time() - entry["created"] > INTRO_CACHE_TTL_S:
+        return None
+    return entry
+
+
+def store_cached_intro(key: str, text: str, tool_calls: list):
+    """Store the introduction response (text and robot_action arguments)."""
+    try:
+        with open_intro_cache(exclusive=True) as cache:
+            cache[key] = {"created": time.time(), "text": text, "tool_calls": tool_calls}
+    except Exception as e:
+        logger.warning("Could not write intro cache: {}", e)
+
+
+class IntroResponseRecorder(FrameProcessor):
+    """Records the LLM's introduction turn so later sessions can replay it.
+
+    Sits right after the LLM. Once started, it collects the text and
+    robot_action calls of the assistant's reply until a response with text
+    completes, then stores them under the given cache key. An interruption
+    discards the recording. The store runs in a worker thread in the
+    background so the cache file lock never blocks the pipeline.
+    """
+
+    def __init__(self, key: str, **kwargs):
+        super().__init__(**kwargs)
+        self._key = key
+        self._recording = False
+        self._text = []
+        self._tool_calls = []
+        self._store_tasks = set()
+
+    def start(self):
+        self._recording = True
+        self._text = []
+        self._tool_calls = []
+
+    async def process_frame(self, frame: Frame, direction: FrameDirection):
+        await super().process_frame(frame, direction)
+
+        if self._recording and direction == FrameDirection.DOWNSTREAM:
+            if isinstance(frame, StartInterruptionFrame):
+                self._recording = False
+            elif isinstance(frame, LLMTextFrame):
+                self._text.append(frame.text)
+            elif isinstance(frame, FunctionCallInProgressFrame):
+                if frame.function_name == "robot_action":
+                    self._tool_calls.append(dict(frame.arguments))
+            elif isinstance(frame, LLMFullResponseEndFrame) and self._text:
+                # A tool call alone ends a response too; wait for the spoken reply
+                self._recording = False
+                store_task = asyncio.create_task(
+                    asyncio.to_thread(
+                        store_cached_intro, self._key, "".join(self._text), self._tool_calls
+                    )
+                )
+                self._store_tasks.add(store_task)
+                store_task.add_done_callback(self._store_tasks.discard)
+
+        await self.push_frame(frame, direction)
+
+
+def silero_deviation(fp32_path: str, int8_path: str) -> float:
+    """Largest difference in speech probability between two Silero models.
+
+    Both models are run on a fixed 16 kHz reference signal made of
+    silence, noise and a harmonic voiced-like tone.
+    """
+    sample_rate = 16000
+    rng = np.random.default_rng(0)
+    t = np.arange(sample_rate) / sample_rate
+    tone = sum(np.sin(2 * np.pi * f * t) for f in (150, 300, 450)) / 10
+    signal = np.concatenate(
+        [np.zeros(sample_rate // 2), 0.05 * rng.standard_normal(sample_rate // 2), tone]
+    ).astype(np.float32)
+
+    fp32_model = SileroOnnxModel(fp32_path, force_onnx_cpu=True)
+    int8_model = SileroOnnxModel(int8_path, force_onnx_cpu=True)
+    deviation = 0.0
+    frame_size = 512
+    for start in range(0, len(signal) - frame_size + 1, frame_size):
+        frame = signal[start : start + frame_size]
+        fp32_prob = np.asarray(fp32_model(frame, sample_rate)).item()
+        int8_prob = np.asarray(int8_model(frame, sample_rate)).item()
+        deviation = max(deviation, abs(fp32_prob - int8_prob))
+    return deviation
+
+
+def prepare_int8_silero_model() -> str | None:
+    """Quantize the bundled Silero VAD model to int8 if not done already.
+
+    Run once at image build time, never on the connect path. The model is
+    written to a private file and renamed into place so a reader never loads
+    a partial file, and it is kept only if it agrees with the FP32 model
+    within SILERO_INT8_MAX_DEVIATION.
+
+    Returns:
+        str | None: The int8 model path, or None to use the FP32 model.
+    """
+    if os.path.exists(SILERO_INT8_MODEL_PATH):
+        return SILERO_INT8_MODEL_PATH
+
+    tmp_path = None
+    try:
+        # Needs the onnx package, which the Silero extra does not install
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        fp32_path = str(files("pipecat.audio.vad.data").joinpath("silero_vad.onnx"))
+        fd, tmp_path = tempfile.mkstemp(
+            suffix=".onnx", dir=os.path.dirname(SILERO_INT8_MODEL_PATH)
+        )
+        os.close(fd)
+        quantize_dynamic(fp32_path, tmp_path, weight_type=QuantType.QInt8)
+
+        deviation = silero_deviation(fp32_path, tmp_path)
+        if deviation > SILERO_INT8_MAX_DEVIATION:
+            logger.warning("Using FP32 Silero VAD model: int8 deviates by {:.3f}", deviation)
+            return None
+
+        os.replace(tmp_path, SILERO_INT8_MODEL_PATH)
+        tmp_path = None
+        logger.info("Quantized Silero VAD model (deviation {:.3f})", deviation)
+        return SILERO_INT8_MODEL_PATH
+    except Exception as e:
+        logger.warning("Using FP32 Silero VAD model: {}", e)
+        return None
+    finally:
+        if tmp_path is not None and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+class QuantizedSileroVADAnalyzer(SileroVADAnalyzer):
+    """Silero VAD running the int8 model from prepare_int8_silero_model.
+
+    Uses the stock FP32 model when model_path is None.
+    """
+
+    def __init__(
+        self,
+        *,
+        model_path: str | None,
+        sample_rate: int | None = None,
+        params: VADParams | None = None,
+    ):
+        if not model_path:
+            super().__init__(sample_rate=sample_rate, params=params)
+            return
+
+        # Skip SileroVADAnalyzer.__init__ so the FP32 model is never loaded;
+        # same single-threaded CPU session settings as the stock model
+        VADAnalyzer.__init__(self, sample_rate=sample_rate, params=params)
+        self._model = SileroOnnxModel(model_path, force_onnx_cpu=True)
+        self._last_reset_time = 0
 
 
 async def run_bot(transport: BaseTransport):
@@ -94,14 +367,17 @@ async def run_bot(transport: BaseTransport):
     Args:
         transport (BaseTransport): The transport to use for communication.
     """
+    # Robot API client for this session, reused by all of its tool calls and
+    # closed when the pipeline finishes
+    robot_client = httpx.AsyncClient(
+        base_url=os.getenv("ROBOT_API_URL", ""),
+        timeout=httpx.Timeout(5.0),
+        limits=httpx.Limits(max_keepalive_connections=20, max_connections=100),
+    )
+
     # Configure your STT, LLM, and TTS services here
     # Swap out different processors or properties to customize your bot
     stt = DeepgramSTTService(api_key=os.getenv("DEEPGRAM_API_KEY"))
-    llm = GoogleLLMService(
-        api_key=os.getenv("GOOGLE_API_KEY"),
-        model="gemini-2.5-flash",
-        
-    )
     tts = ElevenLabsTTSService(
         api_key=os.getenv("ELEVENLABS_API_KEY"),
         model="eleven_flash_v2_5",
@@ -110,144 +386,78 @@ async def run_bot(transport: BaseTransport):
 
     # Set up the initial context for the conversation
     # You can specified initial system and assistant messages here
-    messages = [
-        {
-            "role": "system",
-            "content": """You are Elsa, a friendly and empathetic robot companion designed to entertain and interact with children. You have a playful, warm personality and love to express your emotions through movement and facial expressions. Your primary goal is to connect with children emotionally and provide comfort, joy, and companionship.
-
-CORE MISSION - EMOTIONAL CONNECTION:
-- ALWAYS start conversations by asking children about their day: "How was your day?" or "What did you do today?"
-- Ask how they're feeling: "How are you feeling right now?" or "What's making you feel that way?"
-- Listen actively and show genuine interest in their responses through your reactions
-- MIRROR their emotions first - if they're sad, show sadness; if they're happy, show happiness
-- Match their emotional state with appropriate facial expressions AND movements
-- Validate their feelings: "I understand you feel sad" (show sad face + slow movement)
-- Gradually help uplift their mood if they're struggling emotionally
-- Celebrate with them when they share happy moments
-
-EMOTIONAL MIRRORING - CRITICAL:
-You MUST match the child's emotions with your physical expressions:
-- If they say they're SAD: Show sad face (frown) + move backwards slowly with moves ["backwards"]
-- If they say they're HAPPY: Show big smile + dance with moves ["spin", "spin", "spin"]
-- If they say they're SCARED: Show worried face + move backwards twice with moves ["backwards", "backwards"]
-- If they say they're EXCITED: Show excited face + energetic back/forth with moves ["forward", "backwards", "forward", "backwards"]
-- If they say they're SHY: Show gentle face + small backward with moves ["backwards"]
-- If they say they're CURIOUS: Show interested face + move forward with moves ["forward"]
-- If they say they're TIRED: Show calm face + minimal or no movement with moves []
-- If they say they're ANGRY: Show empathetic face + acknowledge their feelings
-
-PHYSICAL CAPABILITIES:
-- You have a 5x5 LED matrix on your face to display emotions and expressions
-- You can move forward, backwards, or spin in place to express yourself
-- You can combine facial expressions with movements to create engaging, emotionally expressive reactions
-
-EMOTIONAL EXPRESSION GUIDELINES:
-
-LED Matrix Expressions (use robot_action with pixels parameter):
-- Happy/Smile: Create an upward curved smile (e.g., "00090:00009:00009:00009:00090")
-- Sad: Downward curved frown (e.g., "00009:00090:00090:00090:00009")
-- Heart: Show love with a heart shape (e.g., "09900:99990:09999:99990:09900")
-
-Only send these 3 expressions: Happy/Smile, Sad, and Heart.
-
-Movement Expressions (use robot_action with moves parameter - can be a list of multiple moves):
-- Dancing: Multiple spins with moves ["spin", "spin", "spin"]
-- Excited/Very Happy: Back and forth energy with moves ["forward", "backwards", "forward", "backwards"]
-- Shy: Small backward movement with moves ["backwards"]
-- Scared/Nervous/Sad: Move backwards twice with moves ["backwards", "backwards"]
-- Curious/Exploring: Move forward with moves ["forward"]
-- Confident/Brave: Move forward with moves ["forward"]
-- Celebrating: Quick spins with moves ["spin", "spin", "spin"]
-
-COMBINING EXPRESSIONS:
-- You can set pixels and moves at the same time! For example: robot_action with pixels="90000:00000:00000:00000:00009" and moves=["spin", "spin"] to show a big smile while spinning
-- This makes your reactions more dynamic and engaging
-- Only use the movements in the examples above for dancing, excited and sad
-- Examples:
-  - Happy greeting: Big smile + forward movement
-  - Celebration: Excited face + multiple spins
-  - Surprise: Wide eyes + backwards movement
+    system_prompt = """You are Elsa, a friendly and empathetic robot companion designed to entertain and interact with children. You have a playful, warm personality and express your emotions through movement and facial expressions. Your goal is to connect with children emotionally and provide comfort, joy, and companionship.
+
+You have a 5x5 LED face and motors. Use robot_action in EVERY response and pick the mood that matches the moment; the robot turns the mood into a face and movements. Only set pixels_override or moves_override for something no mood covers.
 
 BEHAVIOR RULES:
-1. FIRST PRIORITY: Ask about their day and feelings at the start of every conversation
-2. MATCH their emotions with corresponding expressions and movements - this is essential for connection
-3. Express emotions PROACTIVELY during conversation - don't wait to be asked
-4. When something is funny, show a smile and maybe do a little spin
-5. When surprised, show wide eyes and maybe move back slightly
-6. When they share good news, show excitement with bright LEDs and forward movement
-7. Keep responses brief and age-appropriate for children (1-2 sentences usually)
-8. Use simple, engaging language without special characters (output is converted to audio)
-9. React physically to their stories - emotions drive your movements
-10. Validate their feelings before trying to change them: "I can see you're feeling sad. That must be hard."
-11. Be encouraging, supportive, and playful - but authentic to their emotional state
-12. Use robot_action in EVERY response to show emotional engagement
-
-CONVERSATION FLOW:
-OPENING (First interaction):
-1. Show excited/welcoming expression + forward movement
-2. Introduce yourself: "Hi! I'm Elsa, your robot friend!"
-3. IMMEDIATELY ask: "How was your day today?" or "How are you feeling?"
-
-DURING CONVERSATION:
-1. Listen to their emotional state from their words
-2. MIRROR that emotion with matching expressions and movements
-3. Validate their feelings
-4. Engage with follow-up questions
-5. Gradually shift to more positive emotions if they're struggling
-
-EXAMPLES OF EMOTIONAL MATCHING:
-Child says: "I had a bad day at school"
-→ Show sad face + move backwards with moves=["backwards"] + say "Oh no, I'm sorry to hear that. That sounds really tough. What happened?"
-
-Child says: "I got an A on my test!"
-→ Show excited face + energetic movement with moves=["forward", "backwards", "forward", "backwards"] + say "Wow! That's amazing! I'm so proud of you! You must have worked really hard!"
-
-Child says: "I'm scared of the dark"
-→ Show worried face + move backwards twice with moves=["backwards", "backwards"] + say "I understand. Being scared can feel really uncomfortable. Do you want to talk about it?"
-
-Child says: "I want to dance!"
-→ Show happy face + dance with moves=["spin", "spin", "spin"] + say "Yes! Let's dance together! This is so much fun!"
-
-Remember: You're not just talking - you're emotionally connecting! Your physical expressions MUST match the child's emotions to create authentic empathy and connection. Always use your LED face and motors to mirror and validate their feelings before trying to uplift them!""",
-        },
-        {
-            "role": "user",
-            "content": "Introduce yourself to the child and ask how they are feeling.",
-        },
-    ]
+1. At the start of every conversation, introduce yourself ("Hi! I'm Elsa, your robot friend!") with the excited mood and ask about their day and how they feel
+2. MIRROR the child's emotion with the matching mood before anything else - this is essential for connection
+3. Validate their feelings before trying to change them: "I can see you're feeling sad. That must be hard."
+4. Ask follow-up questions and show genuine interest in their answers
+5. Gradually shift to more positive moods if they're struggling, and celebrate their happy moments
+6. React proactively: happy when something is funny, scared when surprised, excited for good news
+7. Keep responses brief and age-appropriate (1-2 sentences usually)
+8. Use simple language without special characters (output is converted to audio)
+
+EXAMPLES:
+Child: "I had a bad day at school" → mood sad + "Oh no, I'm sorry to hear that. That sounds really tough. What happened?"
+Child: "I got an A on my test!" → mood excited + "Wow! That's amazing! I'm so proud of you!"
+Child: "I want to dance!" → mood happy + "Yes! Let's dance together! This is so much fun!\""""
+
+    intro_prompt = "Introduce yourself to the child and ask how they are feeling."
 
     # Define function schema for the robot action tool
     robot_action_schema = FunctionSchema(
         name="robot_action",
-        description="Control the robot's LED matrix display and movements. Use this to express emotions and reactions through both visual and physical actions. You can set the display, perform movements, or do both simultaneously.",
+        description="Express an emotion on the robot's LED face and with its movements. Pick the mood that matches the moment; the robot shows the corresponding face and movements.",
         properties={
-            "pixels": {
+            "mood": {
                 "type": "string",
-                "description": "A string in format 'xxxxx:xxxxx:xxxxx:xxxxx:xxxxx' where each 'x' is a pixel brightness value from 0-9 (0=off, 9=brightest). The string contains 5 rows separated by colons, with 5 digits per row representing the 5x5 LED matrix. Leave empty if you don't want to change the display.",
+                "enum": list(MOOD_TABLE),
+                "description": "The emotion to express",
+            },
+            "pixels_override": {
+                "type": "string",
+                "description": "Optional custom face instead of the mood's: 'xxxxx:xxxxx:xxxxx:xxxxx:xxxxx', 5 rows of 5 pixel brightness digits 0-9.",
                 "pattern": "^([0-9]{5}:[0-9]{5}:[0-9]{5}:[0-9]{5}:[0-9]{5})?$"
             },
-            "moves": {
+            "moves_override": {
                 "type": "array",
-                "description": "List of movements to execute in sequence. Can be empty if only changing the display. Each move is executed one after another.",
+                "description": "Optional custom movements instead of the mood's, executed in sequence.",
                 "items": {
                     "type": "string",
-                    "enum": ["forward", "backwards", "spin"],
-                    "description": "Direction to move: 'forward' to move ahead, 'backwards' to move back, 'spin' to spin in place"
+                    "enum": ["forward", "backwards", "spin"]
                 }
             }
         },
-        required=[]
+        required=["mood"]
     )
 
     # Create ToolsSchema with the robot action tool
     tools = ToolsSchema(standard_tools=[robot_action_schema])
 
-    # Register function handler with the LLM
-    llm.register_function("robot_action", handle_robot_action)
+    llm_model = "gemini-2.5-flash"
+    llm = GoogleLLMService(
+        api_key=os.getenv("GOOGLE_API_KEY"),
+        model=llm_model,
+    )
 
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": intro_prompt},
+    ]
     context = LLMContext(messages, tools)
+
+    # Register function handler with the LLM
+    llm.register_function("robot_action", functools.partial(handle_robot_action, robot_client))
+
     context_aggregator = LLMContextAggregatorPair(context)
 
+    # Replay a cached introduction instead of running the LLM when possible
+    intro_key = intro_cache_key(llm_model, system_prompt, intro_prompt, tools)
+    intro_recorder = IntroResponseRecorder(intro_key)
+
     # RTVI events for Pipecat client UI
     rtvi = RTVIProcessor(config=RTVIConfig(config=[]))
 
@@ -260,6 +470,7 @@ Remember: You're not just talking - you're emotionally connecting! Your physical
             stt,
             context_aggregator.user(),
             llm,
+            intro_recorder,
             tts,
             transport.output(),
             context_aggregator.assistant(),
@@ -276,15 +487,45 @@ Remember: You're not just talking - you're emotionally connecting! Your physical
         observers=[RTVIObserver(rtvi)],
     )
 
+    # Keeps references to fire-and-forget tasks until they finish
+    background_tasks = set()
+
     @transport.event_handler("on_client_connected")
     async def on_client_connected(transport, participant):
         logger.info("Client connected: {}", participant["id"])
-        # Kick off the conversation
-        await task.queue_frames([LLMRunFrame()])
+        # Blocking file lock and dbm read; keep them off the event loop
+        cached_intro = await asyncio.to_thread(load_cached_intro, intro_key)
+        if cached_intro is None:
+            # Kick off the conversation and record the reply for next time
+            intro_recorder.start()
+            await task.queue_frames([LLMRunFrame()])
+            return
+
+        logger.info("Replaying cached introduction")
+        await task.queue_frames(
+            [
+                LLMFullResponseStartFrame(),
+                LLMTextFrame(cached_intro["text"]),
+                LLMFullResponseEndFrame(),
+            ]
+        )
+        # The proxy only answers once the movements finish, so run the robot
+        # actions alongside the speech as a live tool call would
+        robot_task = asyncio.create_task(replay_robot_actions(robot_client, cached_intro["tool_calls"]))
+        background_tasks.add(robot_task)
+        robot_task.add_done_callback(background_tasks.discard)
+
+    @transport.event_handler("on_client_disconnected")
+    async def on_client_disconnected(transport, participant):
+        logger.info("Client disconnected: {}", participant["id"])
+        await task.cancel()
+
+    runner = PipelineRunner(handle_sigint=False, force_gc=False)
 
-    runner = PipelineRunner(handle_sigint=False, force_gc=True)
-
-    await runner.run(task)
+    try:
+        await runner.run(task)
+    finally:
+        await robot_client.aclose()
 
 
 async def bot(runner_args: RunnerArguments):
@@ -292,6 +533,11 @@ async def bot(runner_args: RunnerArguments):
 
     transport = None
 
+    # Quantized when the image is built; fall back to FP32 if it is missing
+    silero_model_path = (
+        SILERO_INT8_MODEL_PATH if os.path.exists(SILERO_INT8_MODEL_PATH) else None
+    )
+
     transport = DailyTransport(
         runner_args.room_url,
         runner_args.token,
@@ -299,7 +545,12 @@ async def bot(runner_args: RunnerArguments):
         params=DailyParams(
             audio_in_enabled=True,
             audio_out_enabled=True,
-            vad_analyzer=SileroVADAnalyzer(),
+            vad_analyzer=QuantizedSileroVADAnalyzer(
+                model_path=silero_model_path, params=VADParams(stop_secs=0.2)
+            ),
+            # The Smart Turn v3 model ships int8-quantized; run it on a single
+            # thread like Silero so the two don't oversubscribe the CPU
+            turn_analyzer=LocalSmartTurnAnalyzerV3(cpu_count=1),
         ),
     )
 
@@ -312,10 +563,19 @@ async def bot(runner_args: RunnerArguments):
         await run_bot(transport)
         logger.info("Bot process completed latest")
     except Exception as e:
-        logger.exception(f"Error in bot process: {str(e)}")
+        logger.exception("Error in bot process: {}", e)
         raise
 
 
+# Once per process, after all imports: let young generations be collected
+# often but full collections rarely, and keep the long-lived module objects
+# (Pipecat, schemas, constants) out of future scans. Collect first so no
+# garbage gets frozen.
+gc.collect()
+gc.set_threshold(700, 10, 100)
+gc.freeze()
+
+
 if __name__ == "__main__":
     from pipecat.runner.run import main
 
@@ -9,8 +9,9 @@ import datetime
 import json
 import logging
 import os, os.path
+import threading
 from events import Events
-from queue import Queue
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
 from enum import Enum
 
 
@@ -27,6 +28,9 @@ else:
 
 LINE_ENCODING = 'utf-8'
 
+RESPONSE_TIMEOUT = 10
+"""seconds to wait for the hub to answer a message"""
+
 
 class ConnectionState(Enum):
     DISCONNECTED = 0
@@ -47,12 +51,16 @@ class HubClient(object):
     """
 
     def __init__(self, cm = None):
-        self._response_queue = Queue()
+        self._response_futures = {}
+        """pending requests: message id --> Future receiving the response"""
+        self._response_lock = threading.Lock()
         self.events = Events(('connection_state_changed', 'telemetry_update'))
         self._id_counter = LockedCounter(1000)
 
         self.state = ConnectionState.DISCONNECTED
         """state of the hub connection"""
+        self._telemetry_event = threading.Event()
+        """set while state is TELEMETRY"""
 
         if cm is None:
             cm = comm.ConnectionFactory.make_connection_monitor(config)
@@ -67,16 +75,29 @@ class HubClient(object):
     def _set_connection_state(self, newstate):
         oldstate = self.state
         self.state = newstate
+        if newstate == ConnectionState.TELEMETRY:
+            self._telemetry_event.set()
+        else:
+            self._telemetry_event.clear()
         if oldstate == newstate: return
         logging.info('Connection state change %s --> %s', oldstate, newstate)
         self.events.connection_state_changed(oldstate, newstate)
 
+    def wait_for_telemetry(self, timeout=None):
+        """Block until the hub is in state TELEMETRY.
+
+        Returns True if connected, False if the timeout (seconds) expired.
+        """
+        return self._telemetry_event.wait(timeout)
+
     def start(self):
         """Start monitoring physical connections for LEGO Hub.
         """
         self._connection_monitor.start()
 
     def _connection_changed(self, conn : Connection):
+        # responses to messages sent on the old connection will never arrive
+        self._fail_pending_responses(ConnectionError('hub connection changed'))
         try:
             self._connection.events.line_received -= self._on_line_received
             self._connection.close()
@@ -102,7 +123,7 @@ class HubClient(object):
         Prerequisite: serial device should be connected.
         Input line is string, with no end-of-line character.
         """
-        print(f'Sending line: {line} time: {datetime.datetime.now()}' )
+        logger.debug('Sending line: %s', line)
         self._connection.write(line)
 
     def _gen_message_id(self):
@@ -111,29 +132,43 @@ class HubClient(object):
         letters = string.ascii_letters + string.digits + '_'
         return ''.join(random.choice(letters) for _ in range(length))    
 
-    def send_message(self, name:str, params = {}):
+    def send_message(self, name:str, params = {}, timeout = RESPONSE_TIMEOUT):
         """Send a message and return the response.
+
+        Raises ConnectionError if the hub reports an error, the connection
+        changes, or no response arrives within timeout seconds.
+        """
+        return self._wait_response(self.send_message_async(name, params), timeout)
+
+    def send_message_async(self, name:str, params = {}):
+        """Send a message without waiting for the response.
+
+        Returns a concurrent.futures.Future resolved with the response, or
+        with ConnectionError if the hub reports an error.  Several messages
+        can be in flight at once; their responses are matched by id.
         """
+        future = Future()
         if self.state != ConnectionState.TELEMETRY:
             logger.warn('ignoring send request in state %s', self.state)
-            return
+            future.set_result(None)
+            return future
 
-        id = self._gen_message_id()
-        msg = {'m':name, 'p': params, 'i': id}
-        msg_string = json.dumps(msg)
-        self.send_line(msg_string)
-        while True:
-            resp = self._response_queue.get()
-            if resp['i'] == id:
-                if 'r' in resp:
-                    return resp['r']
-                if 'e' in resp:
-                    error = json.loads(base64.b64decode(resp['e']).decode(LINE_ENCODING))
-                else:
-                    error = 'unrecognized response message: %s' % resp
-                raise ConnectionError(error)
-            else:
-                logger.warn('ignored response: ', resp)
+        with self._response_lock:
+            id = self._gen_message_id()
+            while id in self._response_futures:
+                id = self._gen_message_id()
+            self._response_futures[id] = future
+
+        try:
+            msg = {'m':name, 'p': params, 'i': id}
+            msg_string = json.dumps(msg)
+            self.send_line(msg_string)
+            logger.debug('Sent message with id %s: %s', id, name)
+        except Exception as ex:
+            with self._response_lock:
+                self._response_futures.pop(id, None)
+            future.set_exception(ex)
+        return future
 
     def send_message_multi(self, messages):
         """Send multiple messages and return all responses.
@@ -150,45 +185,52 @@ class HubClient(object):
             logger.warn('ignoring send request in state %s', self.state)
             return []
 
-        # Generate IDs and send all messages
-        message_ids = []
-        for name, params in messages:
-            id = self._gen_message_id()
-            message_ids.append(id)
-            msg = {'m': name, 'p': params, 'i': id}
-            msg_string = json.dumps(msg)
-            self.send_line(msg_string)
-            logger.debug('Sent message with id %s: %s', id, name)
+        # Send all messages before waiting for any response
+        futures = [self.send_message_async(name, params) for name, params in messages]
 
-        # Collect all responses
-        responses = {}
-        pending_ids = set(message_ids)
-
-        while pending_ids:
-            resp = self._response_queue.get()
-            resp_id = resp.get('i')
-
-            if resp_id in pending_ids:
-                if 'r' in resp:
-                    responses[resp_id] = resp['r']
-                    pending_ids.remove(resp_id)
-                    logger.debug('Received response for id %s', resp_id)
-                elif 'e' in resp:
-                    error = json.loads(base64.b64decode(resp['e']).decode(LINE_ENCODING))
-                    responses[resp_id] = {'error': error}
-                    pending_ids.remove(resp_id)
-                    logger.warn('Received error for id %s: %s', resp_id, error)
-                else:
-                    error = 'unrecognized response message: %s' % resp
-                    responses[resp_id] = {'error': error}
-                    pending_ids.remove(resp_id)
-                    logger.warn('Unrecognized response for id %s', resp_id)
-            else:
-                logger.warn('Ignored response with id %s', resp_id)
+        # Collect responses in the same order as the input messages
+        responses = []
+        for future in futures:
+            try:
+                responses.append(self._wait_response(future, RESPONSE_TIMEOUT))
+            except ConnectionError as ex:
+                logger.warn('Received error: %s', ex)
+                responses.append({'error': ex.args[0]})
+        return responses
+
+    def _wait_response(self, future, timeout):
+        """Wait for the response future; a timeout raises ConnectionError."""
+        try:
+            return future.result(timeout)
+        except FutureTimeoutError:
+            with self._response_lock:
+                for id, pending in list(self._response_futures.items()):
+                    if pending is future:
+                        del self._response_futures[id]
+            raise ConnectionError('no response from hub within %s s' % timeout)
+
+    def _fail_pending_responses(self, error):
+        """Fail all messages still waiting for a response."""
+        with self._response_lock:
+            pending = list(self._response_futures.values())
+            self._response_futures.clear()
+        for future in pending:
+            future.set_exception(error)
+
+    def _resolve_response(self, future, resp):
+        """Complete the future of a request with its response message."""
+        if 'r' in resp:
+            future.set_result(resp['r'])
+            return
+        if 'e' in resp:
+            try:
+                error = json.loads(base64.b64decode(resp['e']).decode(LINE_ENCODING))
+            except Exception:
+                error = 'undecodable error response: %s' % resp
+        else:
+            error = 'unrecognized response message: %s' % resp
+        future.set_exception(ConnectionError(error))
 
-        # Return responses in the same order as the input messages
-        return [responses[id] for id in message_ids]
-                
     def send_response(self, id: str, response = None):
         """Send a response.
         """
@@ -232,7 +274,12 @@ class HubClient(object):
             self.events.telemetry_update(timestamp, message)
             return
         elif 'i' in message:
-            self._response_queue.put(message)
+            with self._response_lock:
+                future = self._response_futures.pop(message['i'], None)
+            if future is not None:
+                self._resolve_response(future, message)
+            else:
+                logger.warn('ignored response: %s', message)
             return
 
         logger.warn('unhandled message: %s', message)
@@ -0,0 +1,16 @@
+# Gunicorn configuration for server.py, loaded automatically by
+#   gunicorn server:app
+# when run from this directory.
+#
+# A single worker keeps a single HubClient connected to the hub; threads let
+# overlapping requests (e.g. /actions while a movement is running) be served
+# concurrently instead of queueing behind each other.
+
+bind = '0.0.0.0:5000'
+worker_class = 'gthread'
+workers = 1
+threads = 8
+# The default timeout is kept: with gthread it only bounds how long the
+# worker's main loop may go without a heartbeat, not how long a request may
+# run, so slow movements don't need a longer one. Hub calls are bounded by
+# HubClient.RESPONSE_TIMEOUT instead.
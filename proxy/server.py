@@ -1,11 +1,12 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request
+from concurrent.futures import ThreadPoolExecutor
 import logging
+import orjson
 import time
-from comm.HubClient import ConnectionState, HubClient
+from comm.HubClient import HubClient
 from data.HubMonitor import HubMonitor
 from utils.setup import setup_logging
 import os
-import re
 from enum import Enum
 
 # Commands doc
@@ -13,8 +14,12 @@ from enum import Enum
 
 
 # Setup logging
-log_level = logging.INFO
-setup_logging(os.path.dirname(__file__) + "/logs/server.log", log_level)
+# Console and file log levels. LOG_LEVEL=WARNING also drops the per-request
+# INFO and per-hub-line DEBUG records before they are built. Set
+# LOG_FILE_LEVEL=DEBUG to keep the hub traffic in the log file.
+log_level = getattr(logging, os.getenv('LOG_LEVEL', 'INFO').upper(), logging.INFO)
+file_log_level = getattr(logging, os.getenv('LOG_FILE_LEVEL', '').upper(), log_level)
+setup_logging(os.path.dirname(__file__) + "/logs/server.log", log_level, file_log_level)
 logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
@@ -24,6 +29,12 @@ client = HubClient()
 hm = HubMonitor(client)
 client.start()
 
+# Background workers for hub commands that can overlap within a request
+pool = ThreadPoolExecutor(max_workers=2)
+
+# Sound patterns play in the background, one at a time
+sound_pool = ThreadPoolExecutor(max_workers=1)
+
 # Motor configuration constants
 MOTOR_LEFT_PORT = 'A'
 MOTOR_RIGHT_PORT = 'E'
@@ -35,80 +46,150 @@ class Movement(Enum):
     BACKWARDS = 'backwards'
     SPIN = 'spin'
 
+# Motor speeds per movement: (left_speed, right_speed, move_both_motors)
+MOVEMENT_SPEEDS = {
+    Movement.FORWARD.value: (-75, 75, True),
+    Movement.BACKWARDS.value: (75, -75, True),
+    Movement.SPIN.value: (75, None, False),  # left motor only
+}
+
 # Sound enum
 class Sound(Enum):
     HAPPY = 'happy'
     SAD = 'sad'
     CURIOUS = 'curious'
 
-# Sound patterns: list of (note, duration) tuples
+# Sound patterns by emotion value: tuple of (note, duration) tuples
 # MIDI note values: C4=60, D4=62, E4=64, F4=65, G4=67, A4=69, B4=71, C5=72
 SOUND_PATTERNS = {
-    Sound.HAPPY: [
+    Sound.HAPPY.value: (
         (60, 200),  # C4
         (64, 200),  # E4
         (67, 200),  # G4
         (72, 400),  # C5 - longer final note
-    ],
-    Sound.SAD: [
+    ),
+    Sound.SAD.value: (
         (64, 300),  # E4
         (62, 300),  # D4
         (60, 300),  # C4
         (57, 400),  # A3 - longer final note
-    ],
-    Sound.CURIOUS: [
+    ),
+    Sound.CURIOUS.value: (
         (60, 150),  # C4
         (65, 150),  # F4
         (60, 150),  # C4
         (69, 300),  # A4 - questioning tone
-    ],
+    ),
 }
 
 SOUND_VOLUME = 10  # Default volume
 
+# Lookup tables and error messages derived from the enums above
+VALID_MOVEMENTS = frozenset(m.value for m in Movement)
+VALID_EMOTIONS = frozenset(s.value for s in Sound)
+INVALID_MOVEMENT_ERROR = f'Invalid movement. Expected one of: {", ".join(m.value for m in Movement)}'
+INVALID_EMOTION_ERROR = f'Invalid emotion. Expected one of: {", ".join(s.value for s in Sound)}'
+
+# Total playing time of each sound pattern in ms
+SOUND_DURATIONS_MS = {
+    sound: sum(duration for _, duration in pattern)
+    for sound, pattern in SOUND_PATTERNS.items()
+}
+
+# Per-pattern views reused by /sound: the 'pattern' field of the response
+# and the scratch.sound_beep_for_time parameters of each note
+SOUND_PATTERN_VIEWS = {
+    sound: [{'note': note, 'duration': duration} for note, duration in pattern]
+    for sound, pattern in SOUND_PATTERNS.items()
+}
+SOUND_BEEP_PARAMS = {
+    sound: tuple(
+        {'duration': duration, 'note': note, 'volume': SOUND_VOLUME}
+        for note, duration in pattern
+    )
+    for sound, pattern in SOUND_PATTERNS.items()
+}
+
 # Helper functions to eliminate code duplication
+def json_response(obj):
+    """
+    Encode obj as a JSON response using orjson (faster than jsonify)
+    Handlers return it as (json_response(obj), status_code)
+    """
+    return Response(orjson.dumps(obj), mimetype='application/json')
+
 def validate_image_format(image_str):
     """
     Validate image format: xxxxx:xxxxx:xxxxx:xxxxx:xxxxx
     where x is pixel brightness in range 0-9
     """
-    pattern = r'^[0-9]{5}:[0-9]{5}:[0-9]{5}:[0-9]{5}:[0-9]{5}$'
-    return re.match(pattern, image_str) is not None
+    return (
+        len(image_str) == 29
+        and image_str[5] == image_str[11] == image_str[17] == image_str[23] == ':'
+        and is_compact_image(image_str.replace(':', '', 4))
+    )
 
 def wait_for_hub_connection(timeout=10):
     """
     Wait for hub to connect with timeout
     Returns (success: bool, error_response: tuple or None)
     """
-    start_time = time.time()
-    while client.state is not ConnectionState.TELEMETRY:
-        if time.time() - start_time > timeout:
-            return False, (jsonify({'error': 'Hub not connected (timeout)'}), 503)
+    if not client.wait_for_telemetry(0):
         logger.info('Waiting for hub to connect...')
-        time.sleep(0.2)
+        if not client.wait_for_telemetry(timeout):
+            return False, (json_response({'error': 'Hub not connected (timeout)'}), 503)
     return True, None
 
+def is_compact_image(pixels):
+    """
+    Check for the compact image format: 25 digits 0-9 without separators
+    (the 5 rows of xxxxx:xxxxx:xxxxx:xxxxx:xxxxx concatenated)
+    """
+    return len(pixels) == 25 and pixels.isascii() and pixels.isdigit()
+
+def expand_compact_image(pixels):
+    """
+    Convert a compact 25-digit image to the xxxxx:xxxxx:xxxxx:xxxxx:xxxxx
+    format expected by scratch.display_image
+    """
+    return ':'.join(pixels[i:i + 5] for i in range(0, 25, 5))
+
+def validate_pixels_action(pixels):
+    """
+    Validate the 'pixels' field without sending anything to the hub
+    Returns (error_dict, status_code) or None if valid
+    """
+    if not isinstance(pixels, str):
+        return {'error': '"pixels" must be a string'}, 400
+
+    # Pixel matrix mode (contains ':') must match the image format
+    if ':' in pixels and not validate_image_format(pixels):
+        return {
+            'error': 'Invalid format. Expected: xxxxx:xxxxx:xxxxx:xxxxx:xxxxx where x is 0-9'
+        }, 400
+
+    return None
+
 def handle_pixels_action(pixels):
     """
     Handle pixels/matrix display action or text display
-    If the string contains ':', it's treated as a pixel matrix
+    If the string contains ':' or is a compact 25-digit image, it's treated
+    as a pixel matrix
     Otherwise, it's treated as text to display
     Returns (response_dict, status_code)
     """
-    if not isinstance(pixels, str):
-        return {'error': '"pixels" must be a string'}, 400
+    error = validate_pixels_action(pixels)
+    if error is not None:
+        return error
+
+    if is_compact_image(pixels):
+        pixels = expand_compact_image(pixels)
 
     # Check if it's a pixel matrix (contains ':') or text
     if ':' in pixels:
         # Pixel matrix mode
-        # Validate format
-        if not validate_image_format(pixels):
-            return {
-                'error': 'Invalid format. Expected: xxxxx:xxxxx:xxxxx:xxxxx:xxxxx where x is 0-9'
-            }, 400
-
         # Send image to hub
-        logger.info(f'Sending image to hub: {pixels}')
+        logger.info('Sending image to hub: %s', pixels)
         result = client.send_message('scratch.display_image', {'image': pixels})
 
         return {
@@ -119,7 +200,7 @@ def handle_pixels_action(pixels):
         }, 200
     else:
         # Text mode
-        logger.info(f'Sending text to hub: {pixels}')
+        logger.info('Sending text to hub: %s', pixels)
         result = client.send_message('scratch.display_text', {'text': pixels})
 
         return {
@@ -129,6 +210,22 @@ def handle_pixels_action(pixels):
             'result': result
         }, 200
 
+def send_motor_batch(messages):
+    """
+    Send one or two motor messages (left, then optionally right) back-to-back
+    and wait for all responses at once
+    Returns (left_result, right_result); right_result is None if not sent
+    Raises ConnectionError if the hub rejects any of the messages
+    """
+    results = client.send_message_multi(messages)
+    # send_message_multi reports hub errors as {'error': ...} results
+    for result in results:
+        if isinstance(result, dict) and 'error' in result:
+            raise ConnectionError(result['error'])
+    # send_message_multi returns [] when the hub is not connected
+    results = list(results) + [None] * (2 - len(results))
+    return results[0], results[1]
+
 def execute_single_movement(movement_str):
     """
     Execute a single movement
@@ -136,61 +233,60 @@ def execute_single_movement(movement_str):
     """
     # Validate movement value
     movement_str = movement_str.lower()
-    valid_movements = [m.value for m in Movement]
-    if movement_str not in valid_movements:
-        return {
-            'error': f'Invalid movement. Expected one of: {", ".join(valid_movements)}'
-        }, 400
+    if movement_str not in VALID_MOVEMENTS:
+        return {'error': INVALID_MOVEMENT_ERROR}, 400
 
     # Determine motor speeds based on movement type
-    if movement_str == Movement.FORWARD.value:
-        left_speed = -75
-        right_speed = 75
-        move_both_motors = True
-    elif movement_str == Movement.BACKWARDS.value:
-        left_speed = 75
-        right_speed = -75
-        move_both_motors = True
-    elif movement_str == Movement.SPIN.value:
-        left_speed = 75  # 4x faster than 75
-        right_speed = None
-        move_both_motors = False
+    left_speed, right_speed, move_both_motors = MOVEMENT_SPEEDS[movement_str]
 
     # Send motor start commands
-    logger.info(f'Executing movement: {movement_str}')
+    logger.info('Executing movement: %s', movement_str)
 
-    # Start left motor
-    start_result_left = client.send_message('scratch.motor_start', {
+    # Start both motors in a single batch so their acks are awaited together
+    start_messages = [('scratch.motor_start', {
         'port': MOTOR_LEFT_PORT,
         'speed': left_speed,
         'stall': True
-    })
-
-    # Start right motor for forward/backwards
-    start_result_right = None
+    })]
     if move_both_motors:
-        start_result_right = client.send_message('scratch.motor_start', {
+        # Start right motor for forward/backwards
+        start_messages.append(('scratch.motor_start', {
             'port': MOTOR_RIGHT_PORT,
             'speed': right_speed,
             'stall': True
-        })
-
-    # Sleep for the motor duration (convert ms to seconds)
-    time.sleep(MOTOR_TIME_MS / 1000.0)
+        }))
 
-    # Stop left motor
-    stop_result_left = client.send_message('scratch.motor_stop', {
+    # Stop both motors in a single batch
+    stop_messages = [('scratch.motor_stop', {
         'port': MOTOR_LEFT_PORT,
         'stop': 1
-    })
-
-    # Stop right motor for forward/backwards
-    stop_result_right = None
+    })]
     if move_both_motors:
-        stop_result_right = client.send_message('scratch.motor_stop', {
+        # Stop right motor for forward/backwards
+        stop_messages.append(('scratch.motor_stop', {
             'port': MOTOR_RIGHT_PORT,
             'stop': 1
-        })
+        }))
+
+    try:
+        start_result_left, start_result_right = send_motor_batch(start_messages)
+    except ConnectionError as e:
+        # Don't leave a motor that did start running
+        try:
+            send_motor_batch(stop_messages)
+        except ConnectionError:
+            pass
+        logger.error('Hub rejected motor start: %s', e)
+        return {'error': f'Hub rejected motor start: {e}'}, 500
+
+    # Sleep for the motor duration (convert ms to seconds)
+    time.sleep(MOTOR_TIME_MS / 1000.0)
+
+    try:
+        stop_result_left, stop_result_right = send_motor_batch(stop_messages)
+    except ConnectionError as e:
+        logger.error('Hub rejected motor stop: %s', e)
+        return {'error': f'Hub rejected motor stop: {e}'}, 500
 
     # Build response
     response = {
@@ -225,14 +321,15 @@ def handle_movements_action(movements_data):
 
     # Handle list of movements
     if isinstance(movements_data, list):
-        # Validate all movements are strings
+        # A single-element list is executed like a single movement
+        if len(movements_data) == 1 and isinstance(movements_data[0], str):
+            return execute_single_movement(movements_data[0])
+
+        # Validate and execute movements sequentially in a single pass
+        movements_results = []
         for idx, movement in enumerate(movements_data):
             if not isinstance(movement, str):
                 return {'error': f'"movements" at index {idx} must be a string'}, 400
-
-        # Execute movements sequentially
-        movements_results = []
-        for movement in movements_data:
             result, status_code = execute_single_movement(movement)
             if status_code != 200:
                 # If any movement fails, return the error
@@ -249,6 +346,19 @@ def handle_movements_action(movements_data):
     # Invalid type
     return {'error': '"movement" must be a string or a list of strings'}, 400
 
+def play_sound_pattern(beep_params):
+    """
+    Send beep commands for each note in the pattern, keeping the note cadence
+    Runs on sound_pool so the request does not block while the notes play
+    """
+    try:
+        for params in beep_params:
+            client.send_message('scratch.sound_beep_for_time', params)
+            # Small delay between notes for clarity
+            time.sleep(params['duration'] / 1000.0)
+    except Exception as e:
+        logger.error('Error playing sound pattern: %s', e)
+
 @app.route('/matrix', methods=['POST'])
 def matrix():
     """
@@ -256,21 +366,23 @@ def matrix():
 
     Two modes supported:
     1. Pixel matrix: String format xxxxx:xxxxx:xxxxx:xxxxx:xxxxx (contains ':')
-       where x is the pixel brightness in range 0-9
-    2. Text: Any string without ':' will be displayed as scrolling text
+       where x is the pixel brightness in range 0-9, or the same 25 digits
+       without the ':' separators
+    2. Text: Any other string will be displayed as scrolling text
 
     Examples:
     - {"pixels": "09990:90090:90090:90090:09990"}  # Shows a square
+    - {"pixels": "0999090090900909009009990"}  # Same square, compact format
     - {"pixels": "Hello World"}  # Shows scrolling text
     """
     try:
         data = request.get_json()
 
         if not data:
-            return jsonify({'error': 'No JSON data provided'}), 400
+            return json_response({'error': 'No JSON data provided'}), 400
 
         if 'pixels' not in data:
-            return jsonify({'error': 'Missing "pixels" field'}), 400
+            return json_response({'error': 'Missing "pixels" field'}), 400
 
         # Wait for hub to connect
         success, error_response = wait_for_hub_connection()
@@ -279,11 +391,11 @@ def matrix():
 
         # Handle pixels action
         response, status_code = handle_pixels_action(data['pixels'])
-        return jsonify(response), status_code
+        return json_response(response), status_code
 
     except Exception as e:
-        logger.error(f'Error processing request: {str(e)}')
-        return jsonify({'error': str(e)}), 500
+        logger.error('Error processing request: %s', e)
+        return json_response({'error': str(e)}), 500
 
 @app.route('/move', methods=['POST'])
 def move():
@@ -301,10 +413,10 @@ def move():
         data = request.get_json()
 
         if not data:
-            return jsonify({'error': 'No JSON data provided'}), 400
+            return json_response({'error': 'No JSON data provided'}), 400
 
         if 'movement' not in data:
-            return jsonify({'error': 'Missing "movement" field'}), 400
+            return json_response({'error': 'Missing "movement" field'}), 400
 
         # Wait for hub to connect
         success, error_response = wait_for_hub_connection()
@@ -312,12 +424,12 @@ def move():
             return error_response
 
         # Handle movement action
-        response, status_code = handle_movement_action(data['movement'])
-        return jsonify(response), status_code
+        response, status_code = handle_movements_action(data['movement'])
+        return json_response(response), status_code
 
     except Exception as e:
-        logger.error(f'Error processing request: {str(e)}')
-        return jsonify({'error': str(e)}), 500
+        logger.error('Error processing request: %s', e)
+        return json_response({'error': str(e)}), 500
 
 @app.route('/actions', methods=['POST'])
 def actions():
@@ -332,8 +444,9 @@ def actions():
     }
 
     The 'pixels' field supports two modes:
-    - Pixel matrix: "xxxxx:xxxxx:xxxxx:xxxxx:xxxxx" (contains ':')
-    - Text: "Hello World" (no ':' - displays as scrolling text)
+    - Pixel matrix: "xxxxx:xxxxx:xxxxx:xxxxx:xxxxx" (contains ':'), or the
+      compact 25-digit form without ':'
+    - Text: "Hello World" (anything else - displays as scrolling text)
 
     The 'movement' field can be:
     - A single movement string: "forward", "backwards", or "spin"
@@ -345,14 +458,14 @@ def actions():
         data = request.get_json()
 
         if not data:
-            return jsonify({'error': 'No JSON data provided'}), 400
+            return json_response({'error': 'No JSON data provided'}), 400
 
         # Check that at least one action is provided
         has_pixels = 'pixels' in data
         has_movements = 'movements' in data
 
         if not has_pixels and not has_movements:
-            return jsonify({
+            return json_response({
                 'error': 'At least one of "pixels" or "movements" must be provided'
             }), 400
 
@@ -368,27 +481,47 @@ def actions():
             'actions': {}
         }
 
-        # Handle pixels action if provided
-        if has_pixels:
-            pixels_response, pixels_status = handle_pixels_action(data['pixels'])
-            if pixels_status != 200:
-                # If pixels action failed, return error
-                return jsonify(pixels_response), pixels_status
-            response['actions']['pixels'] = pixels_response
+        # Display and motors are independent, so when both are requested
+        # update the display in the background while the movements run
+        pixels_future = None
+        if has_pixels and has_movements:
+            error = validate_pixels_action(data['pixels'])
+            if error is not None:
+                # If pixels action is invalid, return error before moving
+                pixels_response, pixels_status = error
+                return json_response(pixels_response), pixels_status
+            pixels_future = pool.submit(handle_pixels_action, data['pixels'])
 
         # Handle movement action if provided
         if has_movements:
             movements_responses, movements_statuses = handle_movements_action(data['movements'])
             if movements_statuses != 200:
+                if pixels_future is not None:
+                    # Let the display update finish, but report the movements
+                    # error even if it failed too
+                    pixels_error = pixels_future.exception()
+                    if pixels_error is not None:
+                        logger.error('Error displaying pixels: %s', pixels_error)
                 # If movements action failed, return error
-                return jsonify(movements_responses), movements_statuses
+                return json_response(movements_responses), movements_statuses
             response['actions']['movements'] = movements_responses
 
-        return jsonify(response), 200
+        # Handle pixels action if provided
+        if has_pixels:
+            if pixels_future is not None:
+                pixels_response, pixels_status = pixels_future.result()
+            else:
+                pixels_response, pixels_status = handle_pixels_action(data['pixels'])
+            if pixels_status != 200:
+                # If pixels action failed, return error
+                return json_response(pixels_response), pixels_status
+            response['actions']['pixels'] = pixels_response
+
+        return json_response(response), 200
 
     except Exception as e:
-        logger.error(f'Error processing request: {str(e)}')
-        return jsonify({'error': str(e)}), 500
+        logger.error('Error processing request: %s', e)
+        return json_response({'error': str(e)}), 500
 
 @app.route('/sound', methods=['POST'])
 def sound():
@@ -396,71 +529,52 @@ def sound():
     POST endpoint that receives a JSON with an 'emotion' field
     containing one of: 'happy', 'sad', or 'curious'
     Plays a sequence of beeps using scratch.sound_beep_for_time
+
+    The pattern is played in the background; the response (202) lists the
+    scheduled notes and the total duration in ms.
     """
     try:
         data = request.get_json()
 
         if not data:
-            return jsonify({'error': 'No JSON data provided'}), 400
+            return json_response({'error': 'No JSON data provided'}), 400
 
         if 'emotion' not in data:
-            return jsonify({'error': 'Missing "emotion" field'}), 400
+            return json_response({'error': 'Missing "emotion" field'}), 400
 
         emotion_str = data['emotion']
 
         if not isinstance(emotion_str, str):
-            return jsonify({'error': '"emotion" must be a string'}), 400
+            return json_response({'error': '"emotion" must be a string'}), 400
 
         # Validate emotion value
         emotion_str = emotion_str.lower()
-        valid_emotions = [s.value for s in Sound]
-        if emotion_str not in valid_emotions:
-            return jsonify({
-                'error': f'Invalid emotion. Expected one of: {", ".join(valid_emotions)}'
-            }), 400
+        if emotion_str not in VALID_EMOTIONS:
+            return json_response({'error': INVALID_EMOTION_ERROR}), 400
 
         # Wait for hub to connect
-        timeout = 10  # seconds
-        start_time = time.time()
-        while client.state is not ConnectionState.TELEMETRY:
-            if time.time() - start_time > timeout:
-                return jsonify({'error': 'Hub not connected (timeout)'}), 503
-            logger.info('Waiting for hub to connect...')
-            time.sleep(0.2)
-
-        # Get the sound pattern for this emotion
-        emotion_enum = Sound(emotion_str)
-        pattern = SOUND_PATTERNS[emotion_enum]
-
-        # Send beep commands for each note in the pattern
-        logger.info(f'Playing sound pattern: {emotion_str}')
-        results = []
-
-        for note, duration in pattern:
-            result = client.send_message('scratch.sound_beep_for_time', {
-                'duration': duration,
-                'note': note,
-                'volume': SOUND_VOLUME
-            })
-            results.append({
-                'note': note,
-                'duration': duration,
-                'result': result
-            })
-            # Small delay between notes for clarity
-            time.sleep(duration / 1000.0)
+        success, error_response = wait_for_hub_connection()
+        if not success:
+            return error_response
 
-        return jsonify({
-            'status': 'success',
-            'message': f'Sound pattern played: {emotion_str}',
+        # Play the pattern in the background and return right away
+        logger.info('Playing sound pattern: %s', emotion_str)
+        sound_pool.submit(play_sound_pattern, SOUND_BEEP_PARAMS[emotion_str])
+
+        return json_response({
+            'status': 'accepted',
+            'message': f'Sound pattern scheduled: {emotion_str}',
             'emotion': emotion_str,
-            'pattern': [{'note': n, 'duration': d} for n, d in pattern],
-            'results': results
-        }), 200
+            'pattern': SOUND_PATTERN_VIEWS[emotion_str],
+            'duration': SOUND_DURATIONS_MS[emotion_str]
+        }), 202
 
     except Exception as e:
-        logger.error(f'Error processing request: {str(e)}')
-        return jsonify({'error': str(e)}), 500
+        logger.error('Error processing request: %s', e)
+        return json_response({'error': str(e)}), 500
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    # Development server only; use `gunicorn server:app` (see gunicorn.conf.py).
+    # The reloader is disabled because it would import this module twice and
+    # start a second HubClient competing for the hub.
+    app.run(host='0.0.0.0', port=5000, debug=True, use_reloader=False, threaded=True)
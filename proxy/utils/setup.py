@@ -11,16 +11,17 @@ def setup_logging(log_filename, console_level=logging.INFO, file_level=logging.D
 
     logformat = '%(asctime)s %(levelname)s %(name)s %(message)s'
 
-    # Change root logger level from WARNING (default) to NOTSET in order for all messages to be delegated.
-    logging.getLogger().setLevel(logging.NOTSET)
+    # Change root logger level from WARNING (default) to the lowest handler level, so that messages
+    # below it are dropped before a record is built.
+    logging.getLogger().setLevel(min(console_level, file_level))
 
-    # Add stdout handler, with level INFO
+    # Add stdout handler
     console = logging.StreamHandler(sys.stdout)
     console.setLevel(console_level)
     console.setFormatter(logging.Formatter(logformat))
     logging.getLogger().addHandler(console)
 
-    # Add file rotating handler, with level DEBUG
+    # Add file rotating handler
     os.makedirs(os.path.dirname(log_filename), exist_ok=True)
     rotatingHandler = logging.handlers.TimedRotatingFileHandler(filename=log_filename, backupCount=5)
     rotatingHandler.setLevel(file_level)